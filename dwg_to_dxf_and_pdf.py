@@ -21,6 +21,31 @@ if __name__ == "__main__":
     # PDF backends
     parser.add_argument("--inkscape", action="store_true", help="Use Inkscape for DXF -> PDF")
     parser.add_argument("--aspose", action="store_true", help="Use Aspose for DXF -> PDF")
+    parser.add_argument("--ezdxf", action="store_true", help="Use ezdxf for DXF -> PNG")
+
+    # Engine selection: "flags" runs every backend enabled above,
+    # "auto" renders each artifact once with the cheapest engine per file (with fallback)
+    parser.add_argument("--engine", choices=["flags", "auto"], default="flags",
+                        help="Backend selection mode for DXF -> PDF/PNG")
+    parser.add_argument("--engine_timeout", type=int, default=120,
+                        help="Seconds before --engine auto falls back to the next engine")
+
+    # Combined PDFs (one binder per folder / for everything instead of one PDF per DXF)
+    parser.add_argument("--binder", choices=["folder", "all"], default=None,
+                        help="Write combined multi-page PDFs with a bookmark per DXF")
+    parser.add_argument("--binder_max_pages", type=int, default=None,
+                        help="Split binders after this many pages")
+    parser.add_argument("--binder_max_mb", type=float, default=None,
+                        help="Split binders after roughly this many MB")
+
+    # Image encoding (see support.IMAGE_FORMATS)
+    parser.add_argument("--img_format", default="png",
+                        choices=["png", "png8", "png1", "jpg", "webp", "tiff_g4"],
+                        help="Image encoding for DXF -> image (Aspose and ezdxf)")
+    parser.add_argument("--png_level", type=int, default=6, choices=range(10), metavar="0-9",
+                        help="zlib level for PNG outputs (0 = fastest, 9 = smallest)")
+    parser.add_argument("--bench_formats", action="store_true",
+                        help="Only benchmark encode time/size per image format on existing DXFs")
 
     # Convenience
     parser.add_argument("--overwrite", action="store_true", help="Overwrite existing outputs")
@@ -41,6 +66,11 @@ if __name__ == "__main__":
         args.aspose = True
         args.overwrite = False
         args.test_run = False
+        args.binder = None
+        args.engine = "flags"
+        args.img_format = "png"
+        args.png_level = 6
+        args.bench_formats = False
 
     if not os.path.isdir(input_directory):
         raise SystemExit(f"Error: The directory '{input_directory}' does not exist.")
@@ -50,10 +80,20 @@ if __name__ == "__main__":
     print(f"Input directory: {input_directory}")
     support.convert_dwg_to_dxf(input_directory, layers_only=args.layers_only, skip_existing=True)
 
+    if args.bench_formats:
+        dxf_root = str(Path(input_directory) / "DXF_Converted")
+        support.benchmark_image_formats(
+            dxf_root,
+            png_levels=tuple(sorted({1, 6, 9, args.png_level})),
+            csv_out=str(Path(input_directory) / "image_format_benchmark.csv"),
+        )
+        raise SystemExit(0)
+
     # DXF -> PDF via LibreCAD
     dxf_root = str(Path(input_directory) / "DXF_Converted")
     pdf_out  = str(Path(input_directory) / "PDF_From_DXF")
     pdf_out_inkscape  = str(Path(input_directory) / "PDF_From_DXF_inkscape")
+    pdf_out_binder  = str(Path(input_directory) / "PDF_Binders")
     img_out  = str(Path(input_directory) / "IMG_From_DXF")
     img_out_inkscape  = str(Path(input_directory) / "IMG_From_DXF_inkscape")
     # If no flags are provided, default to PDF (your current behavior)
@@ -63,7 +103,37 @@ if __name__ == "__main__":
         
     # support.dxf_to_pdf_librecad(dxf_root, pdf_out)
     # Auto-fit full geometry, add 10px margin, and “zoom out” a bit via 150 DPI
-    if args.to_pdf:
+    if args.to_pdf and args.binder:
+        # Streams every DXF into combined PDFs; replaces the per-file PDF exports
+        support.dxf_to_pdf_binder(
+            dxf_root,
+            pdf_out_binder,
+            engine="inkscape" if args.inkscape and not args.aspose else "aspose",
+            group_by=args.binder,
+            max_pages=args.binder_max_pages,
+            max_mb=args.binder_max_mb,
+            page_width=2200.0,
+            page_height=1700.0,
+            overwrite=args.overwrite,
+            test_run=args.test_run,
+        )
+    if args.engine == "auto":
+        # One output per artifact; engine order is learned in engine_timings.json
+        support.dxf_to_outputs_auto(
+            dxf_root,
+            pdf_out=pdf_out if args.to_pdf and not args.binder else None,
+            img_out=img_out if args.to_png else None,
+            fmt=args.img_format,
+            png_level=args.png_level,
+            timeout_s=args.engine_timeout,
+            timings_path=str(Path(input_directory) / "engine_timings.json"),
+            page_width=2200.0,
+            page_height=1700.0,
+            dpi=200,
+            overwrite=args.overwrite,
+            test_run=args.test_run,
+        )
+    elif args.to_pdf and not args.binder:
         if args.inkscape:
             support.dxf_to_pdf_inkscape(
                 dxf_root,
@@ -83,12 +153,13 @@ if __name__ == "__main__":
                 overwrite=args.overwrite,
                 test_run=args.test_run,   # or True if you want to test only 1 file
             )
-    if args.to_png:
+    if args.to_png and args.engine != "auto":
         if args.aspose :
             support.dxf_to_image_aspose(
                 dxf_root,
                 img_out,
-                fmt="png",
+                fmt=args.img_format,
+                png_level=args.png_level,
                 page_width=2200.0,
                 page_height=1700.0,
                 overwrite=args.overwrite,
@@ -110,6 +181,8 @@ if __name__ == "__main__":
                 dxf_root,
                 img_out + "_ezdxf", # Output to a different folder to compare
                 dpi=200,
+                fmt=args.img_format,
+                png_level=args.png_level,
                 overwrite=args.overwrite,
                 test_run=args.test_run,
             )
\ No newline at end of file
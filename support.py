@@ -1,8 +1,17 @@
 # support.py
 import aspose.cad as cad
+import os
 import time
+import csv
+import json
+import multiprocessing
+import shutil
 from aspose.cad import Image
 import ezdxf
+import io
+import tempfile
+from glob import escape as glob_escape
+from pypdf import PdfReader, PdfWriter
 from tqdm import tqdm  # Progress bar
 import subprocess
 import shlex
@@ -21,6 +30,7 @@ from ezdxf.addons.drawing import RenderContext, Frontend
 from ezdxf.addons.drawing.matplotlib import MatplotlibBackend
 from ezdxf.addons.drawing.properties import LayoutProperties
 import matplotlib.pyplot as plt
+from PIL import Image as PILImage, ImageChops
 
 def load_ini(path: str | Path = "config.ini") -> ConfigParser:
     cfg = ConfigParser()
@@ -47,9 +57,9 @@ def validate_external_tools():
 def _run1(cmd: str, cwd: Path | None = None):
     print(">>", cmd)
     subprocess.run(shlex.split(cmd), check=True, cwd=str(cwd) if cwd else None)
-def _run2(args, cwd=None):
+def _run2(args, cwd=None, timeout=None):
     return subprocess.run(args, cwd=str(cwd) if cwd else None,
-                          capture_output=True, text=True)
+                          capture_output=True, text=True, timeout=timeout)
 # --------------- DWG -> DXF ---------------
 def _save_as_dxf(dwg_path: Path, dxf_path: Path, dxf_version: str = "ACAD2013"):
     ver_map = {
@@ -197,6 +207,84 @@ def dxf_to_pdf_inkscape_simple(dxf_root: str, pdf_out: str,
         if test_run:
             break
 
+def _pdf_inkscape_one(
+    inkscape: str,
+    dxf: Path,
+    target_pdf: Path,
+    *,
+    area: str = "drawing",
+    margin_px: int = 10,
+    dpi: int | None = 150,
+    use_actions_fallback: bool = True,
+    timeout_s: int | None = None,
+) -> bool:
+    """
+    Render a single DXF -> PDF with Inkscape. Returns True if target_pdf was written.
+    timeout_s bounds the primary call and the actions fallback together (the
+    fallback only gets the time left); a timeout counts as a failure.
+    """
+    deadline = time.monotonic() + timeout_s if timeout_s else None
+    # --- Primary attempt: --export-area-* flags ---
+    args = [inkscape, str(dxf), "--export-type=pdf", f"--export-filename={str(target_pdf)}"]
+
+    if area.lower() == "page":
+        args.append("--export-area-page")
+    else:
+        args.append("--export-area-drawing")
+        if margin_px and margin_px > 0:
+            args.append(f"--export-margin={int(margin_px)}")
+
+    if dpi is not None:
+        args.append(f"--export-dpi={int(dpi)}")
+
+    try:
+        r = _run2(args, timeout=timeout_s)
+    except subprocess.TimeoutExpired:
+        print(f"!! TIMEOUT ({timeout_s}s): {dxf.name}")
+        return False
+    if r.returncode == 0 and target_pdf.exists():
+        return True  # success
+
+    print(f"[warn] Primary export failed for {dxf.name}. Code={r.returncode}")
+    if r.stderr:
+        print(f"STDERR:\n{r.stderr}")
+    if r.stdout:
+        print(f"STDOUT:\n{r.stdout}")
+
+    # --- Fallback attempt: fit canvas to drawing with actions, then export ---
+    if use_actions_fallback:
+        actions = [
+            "select-all:all",
+            "FitCanvasToDrawing",
+            "export-overwrite",
+            "export-do",
+            "FileClose",
+        ]
+        args2 = [
+            inkscape,
+            str(dxf),
+            "--export-type=pdf",
+            f"--export-filename={str(target_pdf)}",
+            f"--actions={';'.join(actions)}",
+        ]
+        remaining = deadline - time.monotonic() if deadline else None
+        if remaining is not None and remaining <= 0:
+            print(f"!! TIMEOUT ({timeout_s}s): {dxf.name} (no time left for fallback)")
+            return False
+        try:
+            r2 = _run2(args2, timeout=remaining)
+        except subprocess.TimeoutExpired:
+            print(f"!! TIMEOUT ({timeout_s}s): {dxf.name}")
+            return False
+        if r2.returncode == 0 and target_pdf.exists():
+            return True
+        print(f"!! Inkscape fallback failed on {dxf.name}")
+        if r2.stderr:
+            print(f"STDERR:\n{r2.stderr}")
+        if r2.stdout:
+            print(f"STDOUT:\n{r2.stdout}")
+    return False
+
 def dxf_to_pdf_inkscape(
     dxf_root: str,
     pdf_out: str,
@@ -241,57 +329,58 @@ def dxf_to_pdf_inkscape(
         if target_pdf.exists() and not overwrite:
             continue
 
-        # --- Primary attempt: --export-area-* flags ---
-        args = [inkscape, str(dxf), "--export-type=pdf", f"--export-filename={str(target_pdf)}"]
+        _pdf_inkscape_one(
+            inkscape, dxf, target_pdf,
+            area=area, margin_px=margin_px, dpi=dpi,
+            use_actions_fallback=use_actions_fallback,
+        )
 
-        if area.lower() == "page":
-            args.append("--export-area-page")
-        else:
-            args.append("--export-area-drawing")
-            if margin_px and margin_px > 0:
-                args.append(f"--export-margin={int(margin_px)}")
-
-        if dpi is not None:
-            args.append(f"--export-dpi={int(dpi)}")
-
-        r = _run2(args)
-        if r.returncode == 0 and target_pdf.exists():
-            if test_run and idx == 0:
-                break
-            continue  # success
+        if test_run and idx == 0:
+            break
 
-        print(f"[warn] Primary export failed for {dxf.name}. Code={r.returncode}")
-        if r.stderr:
-            print(f"STDERR:\n{r.stderr}")
-        if r.stdout:
-            print(f"STDOUT:\n{r.stdout}")
+def _pdf_aspose_one(
+    dxf: Path,
+    target_pdf: Path,
+    *,
+    page_width: float = 2200.0,
+    page_height: float = 1700.0,
+    exclude_layers_lower: set[str] | None = None,
+):
+    """
+    Render a single DXF -> PDF with Aspose.CAD. Raises on Aspose errors.
+    """
+    # Aspose.CAD in your environment: use Image.load, no .layers available
+    with cad.Image.load(str(dxf)) as image:
+        raster_opts = CadRasterizationOptions()
+        raster_opts.page_width  = float(page_width)
+        raster_opts.page_height = float(page_height)
+        raster_opts.no_scaling = False
+        raster_opts.background_color = cad.Color.white
+
+        # ---------- CONDITIONAL LAYER FILTERING ----------
+        if exclude_layers_lower:
+            # Only works if this Aspose build exposes `layers`
+            if hasattr(image, "layers"):
+                # This branch will *not* run on your current build,
+                # but will start working automatically if you upgrade.
+                for layer in image.layers:
+                    name = (getattr(layer, "layer_name", "") or "").strip()
+                    if name.lower() not in exclude_layers_lower:
+                        raster_opts.layers.add(name)
+            else:
+                # Current situation: this is what will execute now.
+                print(
+                    "WARNING: exclude_layers requested, but this Aspose.CAD "
+                    "version does not expose 'image.layers'. "
+                    "Rendering all layers."
+                )
+        # If exclude_layers is empty, we just render all layers by default.
+        # -------------------------------------------------
 
-        # --- Fallback attempt: fit canvas to drawing with actions, then export ---
-        if use_actions_fallback:
-            actions = [
-                "select-all:all",
-                "FitCanvasToDrawing",
-                "export-overwrite",
-                "export-do",
-                "FileClose",
-            ]
-            args2 = [
-                inkscape,
-                str(dxf),
-                "--export-type=pdf",
-                f"--export-filename={str(target_pdf)}",
-                f"--actions={';'.join(actions)}",
-            ]
-            r2 = _run2(args2)
-            if r2.returncode != 0 or not target_pdf.exists():
-                print(f"!! Inkscape fallback failed on {dxf.name}")
-                if r2.stderr:
-                    print(f"STDERR:\n{r2.stderr}")
-                if r2.stdout:
-                    print(f"STDOUT:\n{r2.stdout}")
+        pdf_opts = PdfOptions()
+        pdf_opts.vector_rasterization_options = raster_opts
 
-        if test_run and idx == 0:
-            break
+        image.save(str(target_pdf), pdf_opts)
 
 def dxf_to_pdf_aspose(
     dxf_root: str,
@@ -339,72 +428,307 @@ def dxf_to_pdf_aspose(
 
         print(f"Converting {dxf} -> {target_pdf}")
 
-        # Aspose.CAD in your environment: use Image.load, no .layers available
-        with cad.Image.load(str(dxf)) as image:
-            raster_opts = CadRasterizationOptions()
-            raster_opts.page_width  = float(page_width)
-            raster_opts.page_height = float(page_height)
-            raster_opts.no_scaling = False
-            raster_opts.background_color = cad.Color.white
-
-            # ---------- CONDITIONAL LAYER FILTERING ----------
-            if exclude_layers_lower:
-                # Only works if this Aspose build exposes `layers`
-                if hasattr(image, "layers"):
-                    # This branch will *not* run on your current build,
-                    # but will start working automatically if you upgrade.
-                    for layer in image.layers:
-                        name = (getattr(layer, "layer_name", "") or "").strip()
-                        if name.lower() not in exclude_layers_lower:
-                            raster_opts.layers.add(name)
-                else:
-                    # Current situation: this is what will execute now.
-                    print(
-                        "WARNING: exclude_layers requested, but this Aspose.CAD "
-                        "version does not expose 'image.layers'. "
-                        "Rendering all layers."
-                    )
-            # If exclude_layers is empty, we just render all layers by default.
-            # -------------------------------------------------
-
-            pdf_opts = PdfOptions()
-            pdf_opts.vector_rasterization_options = raster_opts
-
-            image.save(str(target_pdf), pdf_opts)
+        _pdf_aspose_one(
+            dxf, target_pdf,
+            page_width=page_width,
+            page_height=page_height,
+            exclude_layers_lower=exclude_layers_lower,
+        )
 
         if test_run:
             break
 
+def _flush_binder(writer: PdfWriter, target_pdf: Path, n_files: int):
+    """
+    Deduplicate shared resources (fonts, images, ...) and write one binder PDF.
+    """
+    # Merge byte-identical objects so each font/resource is stored once (pypdf >= 5.0)
+    writer.compress_identical_objects()
+    target_pdf.parent.mkdir(parents=True, exist_ok=True)
+    with open(target_pdf, "wb") as f:
+        writer.write(f)
+    writer.close()
+    print(f"Binder written: {target_pdf.name} ({n_files} drawings, "
+          f"{target_pdf.stat().st_size / 1e6:.1f} MB)")
+
+def dxf_to_pdf_binder(
+    dxf_root: str,
+    binder_out: str,
+    *,
+    engine: str = "aspose",        # "aspose" or "inkscape"
+    group_by: str = "folder",      # "folder" (one binder per subfolder) or "all"
+    max_pages: int | None = None,  # start a new binder part after this many pages
+    max_mb: float | None = None,   # ... or after roughly this many MB
+    page_width: float = 2200.0,    # aspose only
+    page_height: float = 1700.0,   # aspose only
+    area: str = "drawing",         # inkscape only
+    margin_px: int = 10,           # inkscape only
+    dpi: int | None = 150,         # inkscape only
+    timeout_s: int | None = 120,   # inkscape only, per Inkscape call
+    overwrite: bool = False,
+    test_run: bool = False,
+    add_filename: str | None = None,
+):
+    """
+    Convert many DXFs into combined multi-page PDFs ("binders") in one pass.
+
+    Each DXF is rendered to a temporary PDF, appended to the open binder with
+    one bookmark per source file, and the temp file is deleted right away,
+    so no per-drawing PDFs are left to be re-read by a separate merge step.
+
+    - group_by="folder": one binder per DXF subfolder, named after the folder
+      (the DXF root itself is named after dxf_root). "all": a single binder.
+    - max_pages / max_mb: split a binder into "_part002", "_part003", ...
+      max_mb is checked against the rendered size before deduplication,
+      so the written parts come out at or below the cap.
+      Without caps every page of a binder is held in memory until it is
+      written, so set max_pages/max_mb for large trees (esp. group_by="all").
+    - overwrite: the existing "{stem}.pdf" and all "{stem}_partNNN.pdf" files
+      of a binder are deleted before it is rebuilt.
+    - Identical fonts/resources are merged once per binder part before writing.
+    - A DXF that fails to render or yields an unreadable PDF is skipped.
+    """
+    engine_norm = engine.strip().lower()
+    if engine_norm not in ("aspose", "inkscape"):
+        raise ValueError("engine must be 'aspose' or 'inkscape'")
+    group_norm = group_by.strip().lower()
+    if group_norm not in ("folder", "all"):
+        raise ValueError("group_by must be 'folder' or 'all'")
+
+    inkscape = INKSCAPE_EXE if "INKSCAPE_EXE" in globals() else "inkscape"
+
+    dxf_root_p = Path(dxf_root)
+    binder_out_p = Path(binder_out)
+    binder_out_p.mkdir(parents=True, exist_ok=True)
+
+    dxfs = sorted(dxf_root_p.rglob("*.dxf"))
+    print(f"Found {len(dxfs)} DXF files for PDF binder export ({engine_norm}).")
+
+    # Group DXFs -> binder stem (sorted input keeps groups contiguous and ordered)
+    groups: dict[str, list[Path]] = {}
+    for dxf in dxfs:
+        rel_parent = dxf.relative_to(dxf_root_p).parent
+        if group_norm == "all" or not rel_parent.parts:
+            stem = dxf_root_p.resolve().name
+        else:
+            stem = "_".join(rel_parent.parts)
+        if add_filename:
+            stem = f"{stem}{add_filename}"
+        groups.setdefault(stem, []).append(dxf)
+
+    max_bytes = int(max_mb * 1e6) if max_mb else None
+
+    with tempfile.TemporaryDirectory(prefix="dxf_binder_") as tmp_dir:
+        tmp_pdf = Path(tmp_dir) / "drawing.pdf"
+
+        for stem, group_dxfs in groups.items():
+            first_pdf = binder_out_p / f"{stem}.pdf"
+            if first_pdf.exists() and not overwrite:
+                continue
+            # Drop the previous set so a rebuild with fewer parts leaves no stale ones
+            first_pdf.unlink(missing_ok=True)
+            for old_part in binder_out_p.glob(f"{glob_escape(stem)}_part[0-9][0-9][0-9].pdf"):
+                old_part.unlink()
+
+            part = 1
+            writer = PdfWriter()
+            n_pages = n_bytes = n_files = 0
+
+            for dxf in tqdm(group_dxfs, desc=f"DXF -> PDF binder ({stem})", unit="file"):
+                tmp_pdf.unlink(missing_ok=True)
+                try:
+                    if engine_norm == "aspose":
+                        _pdf_aspose_one(dxf, tmp_pdf,
+                                        page_width=page_width, page_height=page_height)
+                        ok = tmp_pdf.exists()
+                    else:
+                        ok = _pdf_inkscape_one(inkscape, dxf, tmp_pdf,
+                                               area=area, margin_px=margin_px, dpi=dpi,
+                                               timeout_s=timeout_s)
+                    if ok:
+                        # Load into memory so the temp file can be reused immediately
+                        data = tmp_pdf.read_bytes()
+                        reader = PdfReader(io.BytesIO(data))
+                        pages = len(reader.pages)
+                except Exception as e:
+                    print(f"!! Failed {dxf.name}: {e}")
+                    ok = False
+                if not ok:
+                    continue
+
+                # Cap reached: close this part and start the next one
+                if n_files and (
+                    (max_pages and n_pages + pages > max_pages)
+                    or (max_bytes and n_bytes + len(data) > max_bytes)
+                ):
+                    name = stem if part == 1 else f"{stem}_part{part:03d}"
+                    _flush_binder(writer, binder_out_p / f"{name}.pdf", n_files)
+                    part += 1
+                    writer = PdfWriter()
+                    n_pages = n_bytes = n_files = 0
+
+                bookmark = "/".join(dxf.relative_to(dxf_root_p).with_suffix("").parts)
+                writer.append(reader, outline_item=bookmark)
+                n_pages += pages
+                n_bytes += len(data)
+                n_files += 1
+
+                if test_run:
+                    break
+
+            if n_files:
+                name = stem if part == 1 else f"{stem}_part{part:03d}"
+                _flush_binder(writer, binder_out_p / f"{name}.pdf", n_files)
+            else:
+                writer.close()
+
+            if test_run:
+                break
+
+# -------------- Image encodings --------------
+# fmt -> file extension. "png" is full color; the others trade color for speed/size,
+# which is usually fine for line drawings on a white background.
+IMAGE_FORMATS = {
+    "png": "png",        # RGB(A), zlib level via png_level
+    "png8": "png",       # 8-bit palette PNG (up to palette_colors colors)
+    "png1": "png",       # 1-bit black/white PNG
+    "jpg": "jpg",
+    "webp": "webp",      # lossless by default (sharp lines), see webp_lossless
+    "tiff_g4": "tif",    # 1-bit TIFF, CCITT Group 4 (archive standard)
+}
+
+def _image_ext(fmt: str) -> tuple[str, str]:
+    """Normalize fmt ("jpeg" -> "jpg") and return (fmt, extension)."""
+    fmt_norm = fmt.strip().lower()
+    if fmt_norm == "jpeg":
+        fmt_norm = "jpg"
+    if fmt_norm not in IMAGE_FORMATS:
+        raise ValueError(f"fmt must be one of {sorted(IMAGE_FORMATS)} (or 'jpeg')")
+    return fmt_norm, IMAGE_FORMATS[fmt_norm]
+
+def _encode_image(
+    img: PILImage.Image,
+    target,                          # Path or file-like (BytesIO for benchmarks)
+    fmt: str,
+    *,
+    png_level: int = 6,              # zlib level 0 (fastest) .. 9 (smallest)
+    palette_colors: int = 256,       # png8 only
+    bw_threshold: int = 200,         # png1/tiff_g4: white only if every channel >= threshold
+    webp_quality: int = 80,
+    webp_lossless: bool = True,
+    webp_method: int = 4,            # 0 (fastest) .. 6 (smallest)
+    jpeg_quality: int = 90,
+):
+    """
+    Encode a rendered PIL image to one of IMAGE_FORMATS with Pillow.
+    """
+    fmt_norm, _ = _image_ext(fmt)
+
+    if fmt_norm in ("png1", "tiff_g4"):
+        # Threshold instead of dithering: keeps thin CAD lines crisp. Use the darkest
+        # channel, not gray level, so light colors (e.g. yellow, ACI 2) stay ink.
+        r, g, b = img.convert("RGB").split()
+        darkest = ImageChops.darker(ImageChops.darker(r, g), b)
+        bw = darkest.point(lambda v: 255 if v >= bw_threshold else 0, mode="1")
+        if fmt_norm == "png1":
+            bw.save(target, format="PNG", compress_level=int(png_level))
+        else:
+            bw.save(target, format="TIFF", compression="group4")
+    elif fmt_norm == "png8":
+        pal = img.convert("RGB").quantize(colors=int(palette_colors),
+                                          method=PILImage.Quantize.FASTOCTREE)
+        pal.save(target, format="PNG", compress_level=int(png_level))
+    elif fmt_norm == "png":
+        img.save(target, format="PNG", compress_level=int(png_level))
+    elif fmt_norm == "webp":
+        img.convert("RGB").save(target, format="WEBP", lossless=webp_lossless,
+                                quality=int(webp_quality), method=int(webp_method))
+    else:
+        img.convert("RGB").save(target, format="JPEG", quality=int(jpeg_quality))
+
+def _image_aspose_one(
+    dxf: Path,
+    target_img: Path,
+    fmt_norm: str,
+    *,
+    page_width: float = 2200.0,
+    page_height: float = 1700.0,
+    raster_width_px: int | None = None,
+    raster_height_px: int | None = None,
+    jpeg_quality: int = 90,
+    png_level: int = 6,
+    **encode_kwargs,
+):
+    """
+    Render a single DXF -> image with Aspose.CAD (fmt_norm from _image_ext). Raises on errors.
+    """
+    with cad.Image.load(str(dxf)) as image:
+        raster_opts = CadRasterizationOptions()
+        raster_opts.page_width  = float(page_width)
+        raster_opts.page_height = float(page_height)
+        raster_opts.no_scaling = False
+        raster_opts.background_color = cad.Color.white
+
+        # Optional explicit pixel sizing (only if your Aspose build supports it)
+        if raster_width_px is not None and hasattr(raster_opts, "rasterization_width"):
+            raster_opts.rasterization_width = int(raster_width_px)
+        if raster_height_px is not None and hasattr(raster_opts, "rasterization_height"):
+            raster_opts.rasterization_height = int(raster_height_px)
+
+        if fmt_norm == "jpg":
+            opts = JpegOptions()
+            opts.vector_rasterization_options = raster_opts
+            # quality property name varies; guard it
+            if hasattr(opts, "quality"):
+                opts.quality = int(jpeg_quality)
+            image.save(str(target_img), opts)
+        else:
+            opts = PngOptions()
+            opts.vector_rasterization_options = raster_opts
+            # Only the final "png" is kept; intermediates skip compression entirely
+            level = png_level if fmt_norm == "png" else 0
+            if hasattr(opts, "compression_level"):
+                opts.compression_level = int(level)
+            if fmt_norm == "png":
+                image.save(str(target_img), opts)
+            else:
+                # Intermediate render lives in a private temp dir, never among the outputs
+                with tempfile.TemporaryDirectory(prefix="dxf_img_") as tmp_dir:
+                    tmp_png = Path(tmp_dir) / "render.png"
+                    image.save(str(tmp_png), opts)
+                    with PILImage.open(tmp_png) as rendered:
+                        _encode_image(rendered, target_img, fmt_norm,
+                                      png_level=png_level, **encode_kwargs)
+
 def dxf_to_image_aspose(
     dxf_root: str,
     img_out: str,
     *,
-    fmt: str = "png",               # "png" or "jpg" / "jpeg"
+    fmt: str = "png",               # any IMAGE_FORMATS key, or "jpeg"
     page_width: float = 2200.0,     # controls framing similarly to your PDF
     page_height: float = 1700.0,
     raster_width_px: int | None = None,   # optional explicit raster size
     raster_height_px: int | None = None,
     jpeg_quality: int = 90,         # only applies to JPEG
+    png_level: int = 6,             # zlib level for png/png8/png1
     overwrite: bool = False,
     test_run: bool = False,
     add_filename: str | None = None,
+    **encode_kwargs,                # passed to _encode_image (webp_quality, bw_threshold, ...)
 ):
     """
-    Convert DXF -> PNG/JPG using Aspose.CAD.
+    Convert DXF -> image using Aspose.CAD.
 
     - page_width/page_height: sets the "paper" aspect/frame (same as your PDF approach)
     - raster_width_px/raster_height_px: optional explicit pixel dimensions (if supported)
-    - fmt: "png" or "jpg"/"jpeg"
+    - fmt: "png"/"jpg" are written by Aspose directly; "png8", "png1", "webp"
+      and "tiff_g4" are rendered to a fast (level 0) PNG in a temp dir and
+      re-encoded with Pillow (see IMAGE_FORMATS / _encode_image)
+    - a DXF that fails to render/encode is reported and skipped
     - add_filename: suffix appended to output filename stem (e.g., "_png")
     """
 
-    fmt_norm = fmt.strip().lower()
-    if fmt_norm in ("jpg", "jpeg"):
-        out_ext = "jpg"
-    elif fmt_norm == "png":
-        out_ext = "png"
-    else:
-        raise ValueError("fmt must be 'png' or 'jpg'/'jpeg'")
+    fmt_norm, out_ext = _image_ext(fmt)
 
     dxf_root_p = Path(dxf_root)
     img_out_p  = Path(img_out)
@@ -423,30 +747,22 @@ def dxf_to_image_aspose(
         if target_img.exists() and not overwrite:
             continue
 
-        with cad.Image.load(str(dxf)) as image:
-            raster_opts = CadRasterizationOptions()
-            raster_opts.page_width  = float(page_width)
-            raster_opts.page_height = float(page_height)
-            raster_opts.no_scaling = False
-            raster_opts.background_color = cad.Color.white
-
-            # Optional explicit pixel sizing (only if your Aspose build supports it)
-            if raster_width_px is not None and hasattr(raster_opts, "rasterization_width"):
-                raster_opts.rasterization_width = int(raster_width_px)
-            if raster_height_px is not None and hasattr(raster_opts, "rasterization_height"):
-                raster_opts.rasterization_height = int(raster_height_px)
-
-            if out_ext == "png":
-                opts = PngOptions()
-                opts.vector_rasterization_options = raster_opts
-                image.save(str(target_img), opts)
-            else:
-                opts = JpegOptions()
-                opts.vector_rasterization_options = raster_opts
-                # quality property name varies; guard it
-                if hasattr(opts, "quality"):
-                    opts.quality = int(jpeg_quality)
-                image.save(str(target_img), opts)
+        try:
+            _image_aspose_one(
+                dxf, target_img, fmt_norm,
+                page_width=page_width,
+                page_height=page_height,
+                raster_width_px=raster_width_px,
+                raster_height_px=raster_height_px,
+                jpeg_quality=jpeg_quality,
+                png_level=png_level,
+                **encode_kwargs,
+            )
+        except Exception as e:
+            print(f"!! Failed {dxf.name}: {e}")
+            # Make sure we don't leave a half-written image behind
+            target_img.unlink(missing_ok=True)
+            continue
 
         if test_run:
             break
@@ -455,6 +771,55 @@ from pathlib import Path
 from tqdm import tqdm
 import subprocess
 
+def _png_inkscape_one(
+    inkscape: str,
+    dxf: Path,
+    target_png: Path,
+    *,
+    dpi: int = 200,
+    margin_px: int = 10,
+    timeout_s: int | None = 60,
+) -> bool:
+    """
+    Render a single DXF -> PNG with Inkscape. Returns True if target_png was written.
+    """
+    args = [
+        inkscape,
+        str(dxf),
+        "--export-type=png",
+        f"--export-filename={str(target_png)}",
+        "--export-area-drawing",
+        f"--export-dpi={int(dpi)}",
+    ]
+
+    if margin_px and margin_px > 0:
+        args.append(f"--export-margin={int(margin_px)}")
+
+    try:
+        r = subprocess.run(
+            args,
+            capture_output=True,
+            text=True,
+            timeout=timeout_s,
+        )
+    except subprocess.TimeoutExpired:
+        print(f"!! TIMEOUT ({timeout_s}s): {dxf.name} (skipping)")
+        return False
+
+    if r.returncode != 0 or not target_png.exists():
+        print(f"!! Inkscape DXF->PNG failed on {dxf.name} (code={r.returncode})")
+        if r.stderr:
+            print(f"STDERR:\n{r.stderr}")
+        if r.stdout:
+            print(f"STDOUT:\n{r.stdout}")
+        # Make sure we don't leave a corrupt file behind
+        try:
+            target_png.unlink(missing_ok=True)
+        except Exception:
+            pass
+        return False
+    return True
+
 def dxf_to_png_inkscape(
     dxf_root: str,
     img_out: str,
@@ -493,93 +858,470 @@ def dxf_to_png_inkscape(
         if target_png.exists() and not overwrite:
             continue
 
-        args = [
-            inkscape,
-            str(dxf),
-            "--export-type=png",
-            f"--export-filename={str(target_png)}",
-            "--export-area-drawing",
-            f"--export-dpi={int(dpi)}",
-        ]
-
-        if margin_px and margin_px > 0:
-            args.append(f"--export-margin={int(margin_px)}")
-
-        try:
-            r = subprocess.run(
-                args,
-                capture_output=True,
-                text=True,
-                timeout=timeout_s,
-            )
-        except subprocess.TimeoutExpired:
-            print(f"!! TIMEOUT ({timeout_s}s): {dxf.name} (skipping)")
-            continue
-
-        if r.returncode != 0 or not target_png.exists():
-            print(f"!! Inkscape DXF->PNG failed on {dxf.name} (code={r.returncode})")
-            if r.stderr:
-                print(f"STDERR:\n{r.stderr}")
-            if r.stdout:
-                print(f"STDOUT:\n{r.stdout}")
-            # Make sure we don't leave a corrupt file behind
-            try:
-                target_png.unlink(missing_ok=True)
-            except Exception:
-                pass
+        if not _png_inkscape_one(inkscape, dxf, target_png,
+                                 dpi=dpi, margin_px=margin_px, timeout_s=timeout_s):
             continue
 
         if test_run:
             break
 
 
+def _ezdxf_render(dxf: Path, *, dpi: int = 200) -> PILImage.Image:
+    """
+    Render the modelspace of one DXF with ezdxf/matplotlib into an in-memory image.
+    """
+    doc = ezdxf.readfile(dxf)
+    msp = doc.modelspace()
+    # --- FIX 1: Missing Layers ---
+    # Force all layers to be visible and unfrozen
+    for layer in doc.layers:
+        layer.on()
+        layer.thaw()
+    # --- FIX 2: Color Mapping & Background ---
+    # LayoutProperties tells ezdxf to swap 'Color 7' to black 
+    # because the background is white.
+    ctx = RenderContext(doc)
+    layout_props = LayoutProperties.from_layout(msp)
+    layout_props.set_colors(bg="#FFFFFF") # Sets logical white background
+    fig = plt.figure(frameon=True)
+    try:
+        fig.patch.set_facecolor("white")
+        ax = fig.add_axes([0, 0, 1, 1])
+        ax.set_facecolor("white")
+        ax.set_axis_off()
+        out = MatplotlibBackend(ax)            
+        # finalize=True is critical for bounding box calculation
+        Frontend(ctx, out).draw_layout(msp, finalize=True, layout_properties=layout_props)
+        # --- FIX 3: Clipping ---
+        # bbox_inches='tight' works better when the layout_properties are set.
+        # Level 0 PNG: this buffer is only decoded again, never stored.
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=dpi, bbox_inches='tight', pad_inches=0.1,
+                    facecolor=fig.get_facecolor(), pil_kwargs={"compress_level": 0})
+    finally:
+        plt.close(fig)
+    buf.seek(0)
+    img = PILImage.open(buf)
+    img.load()
+    return img
+
 def dxf_to_png_ezdxf(
     dxf_root: str,
     img_out: str,
     *,
     dpi: int = 200,
+    fmt: str = "png",               # any IMAGE_FORMATS key; "png1"/"png8" suit line drawings
+    png_level: int = 6,             # zlib level for png/png8/png1
     overwrite: bool = False,
     test_run: bool = False,
+    **encode_kwargs,                # passed to _encode_image (webp_quality, bw_threshold, ...)
 ):
+    fmt_norm, out_ext = _image_ext(fmt)
     dxf_root_p = Path(dxf_root)
     img_out_p = Path(img_out)
     img_out_p.mkdir(parents=True, exist_ok=True)
     dxfs = sorted(dxf_root_p.rglob("*.dxf"))    
-    for dxf in tqdm(dxfs, desc="DXF -> PNG (ezdxf Fast)", unit="file"):
-        target_png = img_out_p / f"{'_'.join(dxf.relative_to(dxf_root_p).with_suffix('').parts)}.png"
-        if target_png.exists() and not overwrite:
+    for dxf in tqdm(dxfs, desc=f"DXF -> {fmt_norm.upper()} (ezdxf Fast)", unit="file"):
+        target_img = img_out_p / f"{'_'.join(dxf.relative_to(dxf_root_p).with_suffix('').parts)}.{out_ext}"
+        if target_img.exists() and not overwrite:
             continue
         try:
-            doc = ezdxf.readfile(dxf)
-            msp = doc.modelspace()
-            # --- FIX 1: Missing Layers ---
-            # Force all layers to be visible and unfrozen
-            for layer in doc.layers:
-                layer.on()
-                layer.thaw()
-            # --- FIX 2: Color Mapping & Background ---
-            # LayoutProperties tells ezdxf to swap 'Color 7' to black 
-            # because the background is white.
-            ctx = RenderContext(doc)
-            layout_props = LayoutProperties.from_layout(msp)
-            layout_props.set_colors(bg="#FFFFFF") # Sets logical white background
-            fig = plt.figure(frameon=True)
-            fig.patch.set_facecolor("white")
-            ax = fig.add_axes([0, 0, 1, 1])
-            ax.set_facecolor("white")
-            ax.set_axis_off()
-            out = MatplotlibBackend(ax)            
-            # finalize=True is critical for bounding box calculation
-            Frontend(ctx, out).draw_layout(msp, finalize=True, layout_properties=layout_props)
-            # --- FIX 3: Clipping ---
-            # bbox_inches='tight' works better when the layout_properties are set
-            fig.savefig(target_png, dpi=dpi, bbox_inches='tight', pad_inches=0.1, facecolor=fig.get_facecolor())
-            plt.close(fig)
+            img = _ezdxf_render(dxf, dpi=dpi)
+            _encode_image(img, target_img, fmt_norm, png_level=png_level, **encode_kwargs)
         except Exception as e:
             print(f"!! Failed {dxf.name}: {e}")
             continue
         if test_run: break
 
+def benchmark_image_formats(
+    dxf_root: str,
+    *,
+    formats: list[str] | None = None,   # default: every IMAGE_FORMATS key
+    png_levels: tuple[int, ...] = (1, 6, 9),
+    dpi: int = 200,
+    max_files: int | None = 5,
+    csv_out: str | None = None,
+    **encode_kwargs,
+) -> list[dict]:
+    """
+    Measure encode time and output size per format on real drawings.
+
+    Each DXF is rendered once with ezdxf, then encoded in memory with every
+    format ("png" and "png1"/"png8" once per zlib level in png_levels), so
+    the numbers isolate encoding cost from rendering cost.
+    Prints a summary table and optionally writes the per-file rows to csv_out.
+    """
+    fmts = [_image_ext(f)[0] for f in (formats or IMAGE_FORMATS)]
+    variants: list[tuple[str, str, dict]] = []
+    for f in fmts:
+        if f in ("png", "png8", "png1"):
+            for lvl in png_levels:
+                variants.append((f"{f}@{lvl}", f, {"png_level": lvl}))
+        else:
+            variants.append((f, f, {}))
+
+    dxfs = sorted(Path(dxf_root).rglob("*.dxf"))
+    if max_files:
+        dxfs = dxfs[:max_files]
+    if not dxfs:
+        print(f"No DXF files found under {dxf_root}; nothing to benchmark.")
+        return []
+    print(f"Benchmarking {len(variants)} encodings on {len(dxfs)} DXF files (dpi={dpi}).")
+
+    rows = []
+    for dxf in tqdm(dxfs, desc="Image format benchmark", unit="file"):
+        try:
+            img = _ezdxf_render(dxf, dpi=dpi)
+        except Exception as e:
+            print(f"!! Failed {dxf.name}: {e}")
+            continue
+        for label, f, kw in variants:
+            buf = io.BytesIO()
+            start = time.perf_counter()
+            _encode_image(img, buf, f, **{**encode_kwargs, **kw})
+            rows.append({
+                "file": dxf.name,
+                "format": label,
+                "encode_s": time.perf_counter() - start,
+                "bytes": buf.tell(),
+            })
+
+    # Summary: mean per variant, size relative to full-color png at the default level
+    print(f"\n{'format':<12}{'encode ms':>12}{'size KB':>12}{'vs png@6':>10}")
+    base = [r["bytes"] for r in rows if r["format"] == "png@6"]
+    base_kb = sum(base) / len(base) / 1024 if base else None
+    for label, _, _ in variants:
+        sel = [r for r in rows if r["format"] == label]
+        if not sel:
+            continue
+        ms = 1000 * sum(r["encode_s"] for r in sel) / len(sel)
+        kb = sum(r["bytes"] for r in sel) / len(sel) / 1024
+        ratio = f"{kb / base_kb:.2f}x" if base_kb else "-"
+        print(f"{label:<12}{ms:>12.1f}{kb:>12.1f}{ratio:>10}")
+
+    if csv_out:
+        with open(csv_out, "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=["file", "format", "encode_s", "bytes"])
+            w.writeheader()
+            w.writerows(rows)
+        print(f"Benchmark rows written to {csv_out}")
+    return rows
+
+# -------------- Automatic engine selection --------------
+# Which engines can produce which artifact ("pdf" or "img")
+AUTO_ENGINES = {
+    "pdf": ["aspose", "inkscape"],
+    "img": ["ezdxf", "aspose", "inkscape"],
+}
+# Cold-start cost model, used until an engine has AUTO_MIN_RUNS timings:
+# seconds = overhead + s_per_kwork * work / 1000, where work is the entity count
+# with hatches/text weighted by how expensive they are for that engine, plus
+# mb * file size in MB (covers vertex-heavy polylines and binary DXFs, which the
+# entity scan under-counts).
+AUTO_PRIORS = {
+    "ezdxf":    {"overhead": 0.5, "s_per_kwork": 0.3, "hatch": 20, "text": 5, "mb": 1500},
+    "aspose":   {"overhead": 1.0, "s_per_kwork": 0.6, "hatch": 2,  "text": 2, "mb": 800},
+    "inkscape": {"overhead": 2.5, "s_per_kwork": 1.5, "hatch": 10, "text": 3, "mb": 1000},
+}
+AUTO_MIN_RUNS = 3
+
+def _dxf_features(dxf: Path) -> dict:
+    """
+    Cheap single-pass scan of an ASCII DXF (no ezdxf document is built).
+    Counts entities in the ENTITIES/BLOCKS sections plus hatch, text and proxy entities.
+    """
+    feats = {"size_mb": dxf.stat().st_size / 1e6,
+             "entities": 0, "hatch": 0, "text": 0, "proxy": 0}
+    section = None
+    expect_section_name = False
+    with open(dxf, "r", encoding="utf-8", errors="ignore") as f:
+        for code in f:
+            value = f.readline().strip()
+            if code.strip() == "2" and expect_section_name:
+                section = value
+                expect_section_name = False
+                continue
+            if code.strip() != "0":
+                continue
+            if value == "SECTION":
+                expect_section_name = True
+            elif value == "ENDSEC":
+                section = None
+            elif section in ("ENTITIES", "BLOCKS") and value not in ("BLOCK", "ENDBLK", "SEQEND", "VERTEX"):
+                feats["entities"] += 1
+                if value == "HATCH":
+                    feats["hatch"] += 1
+                elif value in ("TEXT", "MTEXT", "ATTRIB", "ATTDEF"):
+                    feats["text"] += 1
+                elif value == "ACAD_PROXY_ENTITY":
+                    feats["proxy"] += 1
+    return feats
+
+def _engine_work(engine: str, feats: dict) -> float:
+    p = AUTO_PRIORS[engine]
+    return (feats["entities"]
+            + (p["hatch"] - 1) * feats["hatch"]
+            + (p["text"] - 1) * feats["text"]
+            + p["mb"] * feats["size_mb"])
+
+def _load_timings(path: Path | None) -> dict:
+    if path and path.exists():
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"WARNING: ignoring unreadable timings file {path}: {e}")
+    return {}
+
+def _save_timings(path: Path | None, timings: dict):
+    if path:
+        # Write then swap, so an interrupted run can't leave a truncated file
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(timings, indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+
+def _fit_cost(engine: str, t: dict) -> tuple[float, float]:
+    """
+    (overhead seconds, seconds per work) for an engine: the priors until it has
+    AUTO_MIN_RUNS completed runs, then a least-squares fit of seconds ~ work.
+    If the recorded work values are (nearly) all the same, the prior overhead is
+    kept and only the per-work cost is learned.
+    """
+    p = AUTO_PRIORS[engine]
+    prior = (p["overhead"], p["s_per_kwork"] / 1000)
+    n = t.get("n", 0)
+    if n < AUTO_MIN_RUNS:
+        return prior
+    mean_x, mean_y = t["sx"] / n, t["sy"] / n
+    var_x = t["sxx"] / n - mean_x ** 2
+    if var_x > 1e-9 * max(mean_x ** 2, 1.0):
+        slope = max((t["sxy"] / n - mean_x * mean_y) / var_x, 0.0)
+        overhead = max(mean_y - slope * mean_x, 0.0)
+    else:
+        overhead = prior[0]
+        slope = max(mean_y - overhead, 0.0) / max(mean_x, 1.0)
+    return overhead, slope
+
+def _rank_engines(artifact: str, engines: list[str], feats: dict, timings: dict) -> list[str]:
+    """
+    Order engines by estimated cost for this file (cheapest first).
+    Every engine is scored as overhead + per-work cost (see _fit_cost), so learned
+    and prior estimates are on the same scale. Past failures/timeouts and
+    over-time runs inflate the estimate. Inkscape ignores proxy entities,
+    so it goes last for files that contain them.
+    """
+    def cost(engine):
+        t = timings.get(artifact, {}).get(engine, {})
+        overhead, slope = _fit_cost(engine, t)
+        est = overhead + slope * _engine_work(engine, feats)
+        runs = t.get("ok", 0) + t.get("fail", 0)
+        if runs:
+            est *= 1 + 4 * (t.get("fail", 0) + t.get("slow", 0)) / runs
+        if engine == "inkscape" and feats["proxy"]:
+            est += 1e6
+        return est
+    return sorted(engines, key=cost)
+
+def _record_timing(timings: dict, artifact: str, engine: str, feats: dict,
+                   seconds: float, ok: bool, slow: bool = False):
+    """
+    Completed runs always feed the fit (sums of work/seconds); runs that completed
+    but took longer than the timeout are additionally counted as "slow".
+    Failed or timed-out runs only count as "fail".
+    """
+    t = timings.setdefault(artifact, {}).setdefault(engine, {})
+    for key in ("ok", "fail", "slow", "n", "sx", "sy", "sxx", "sxy"):
+        t.setdefault(key, 0)
+    if not ok:
+        t["fail"] += 1
+        return
+    work = _engine_work(engine, feats)
+    t["ok"] += 1
+    t["slow"] += int(slow)
+    t["n"] += 1
+    t["sx"] += work
+    t["sy"] += seconds
+    t["sxx"] += work * work
+    t["sxy"] += work * seconds
+
+def _auto_render(artifact: str, engine: str, dxf: Path, target: Path, opts: dict):
+    """Run one in-process engine (Aspose/ezdxf) for one artifact. Raises on errors."""
+    if artifact == "pdf":
+        _pdf_aspose_one(dxf, target, page_width=opts["page_width"], page_height=opts["page_height"])
+    elif engine == "ezdxf":
+        img = _ezdxf_render(dxf, dpi=opts["dpi"])
+        _encode_image(img, target, opts["fmt"], png_level=opts["png_level"])
+    else:
+        _image_aspose_one(dxf, target, opts["fmt"], page_width=opts["page_width"],
+                          page_height=opts["page_height"], png_level=opts["png_level"])
+
+def _render_worker_main(conn):
+    # Child process loop: one job at a time, report (ok, error) back
+    while True:
+        job = conn.recv()
+        if job is None:
+            break
+        try:
+            _auto_render(*job)
+            conn.send((True, None))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+class _RenderWorker:
+    """
+    Child process for the in-process engines (Aspose, ezdxf), so a render that
+    exceeds the timeout can be killed. The process is reused across files and
+    restarted only after a timeout or crash.
+    """
+    def __init__(self):
+        self.proc = None
+        self.conn = None
+
+    def _start(self):
+        # Always spawn: forking a parent that already hosts Aspose's .NET runtime
+        # can hang/crash the child, and spawn matches Windows behavior
+        ctx = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = ctx.Pipe()
+        self.proc = ctx.Process(target=_render_worker_main,
+                                args=(child_conn,), daemon=True)
+        self.proc.start()
+        child_conn.close()
+        self.conn = parent_conn
+
+    def run(self, job: tuple, timeout_s: float) -> tuple[bool, str | None]:
+        if self.proc is None or not self.proc.is_alive():
+            self._start()
+        self.conn.send(job)
+        if self.conn.poll(timeout_s):
+            try:
+                return self.conn.recv()
+            except EOFError:
+                self.close(kill=True)
+                return False, "worker process crashed"
+        self.close(kill=True)
+        return False, f"timeout after {timeout_s}s"
+
+    def close(self, kill: bool = False):
+        if self.proc is None:
+            return
+        if kill:
+            self.proc.terminate()
+            self.proc.join(5)
+            if self.proc.is_alive():
+                self.proc.kill()
+                self.proc.join()
+        else:
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+            self.proc.join(5)
+        self.conn.close()
+        self.proc = self.conn = None
+
+def dxf_to_outputs_auto(
+    dxf_root: str,
+    *,
+    pdf_out: str | None = None,      # None: no PDFs
+    img_out: str | None = None,      # None: no images
+    fmt: str = "png",                # image encoding, see IMAGE_FORMATS
+    png_level: int = 6,
+    engines: list[str] | None = None,  # restrict candidates, e.g. ["aspose", "ezdxf"]
+    timeout_s: int = 120,
+    timings_path: str | None = None, # JSON with past per-engine timings (created/updated)
+    page_width: float = 2200.0,
+    page_height: float = 1700.0,
+    dpi: int = 200,
+    overwrite: bool = False,
+    test_run: bool = False,
+):
+    """
+    Render each requested artifact (PDF and/or image) exactly once per DXF,
+    picking the cheapest engine per file and falling back to the next one on
+    failure or timeout.
+
+    - Engine order comes from _rank_engines: file features (_dxf_features) and
+      the measured timings in timings_path, which is updated after every attempt.
+    - timeout_s is a hard limit for every engine: Inkscape via its subprocess,
+      Aspose/ezdxf via a killable worker process (_RenderWorker). A timeout is a
+      failure and falls through to the next engine.
+    - Inkscape is only considered for images when fmt == "png".
+    - Must be called under `if __name__ == "__main__":` (worker process start).
+    """
+    fmt_norm, out_ext = _image_ext(fmt)
+    inkscape = INKSCAPE_EXE if "INKSCAPE_EXE" in globals() else "inkscape"
+    have_inkscape = bool(shutil.which(inkscape) or Path(inkscape).exists())
+    opts = {"fmt": fmt_norm, "png_level": png_level, "dpi": dpi,
+            "page_width": page_width, "page_height": page_height}
+
+    candidates = {}
+    for artifact, out in (("pdf", pdf_out), ("img", img_out)):
+        if out is None:
+            continue
+        cands = [e for e in AUTO_ENGINES[artifact] if not engines or e in engines]
+        if "inkscape" in cands and (not have_inkscape or (artifact == "img" and fmt_norm != "png")):
+            cands.remove("inkscape")
+        if not cands:
+            raise ValueError(f"No usable engine for {artifact} output (engines={engines})")
+        candidates[artifact] = cands
+        Path(out).mkdir(parents=True, exist_ok=True)
+
+    timings_p = Path(timings_path) if timings_path else None
+    timings = _load_timings(timings_p)
+
+    dxf_root_p = Path(dxf_root)
+    dxfs = sorted(dxf_root_p.rglob("*.dxf"))
+    print(f"Found {len(dxfs)} DXF files for export (auto engine: "
+          + ", ".join(f"{a}={'/'.join(c)}" for a, c in candidates.items()) + ").")
+
+    worker = _RenderWorker()
+    try:
+        for dxf in tqdm(dxfs, desc="DXF -> outputs (auto)", unit="file"):
+            stem_unique = "_".join(dxf.relative_to(dxf_root_p).with_suffix("").parts)
+            targets = {}
+            if "pdf" in candidates:
+                targets["pdf"] = Path(pdf_out) / f"{stem_unique}.pdf"
+            if "img" in candidates:
+                targets["img"] = Path(img_out) / f"{stem_unique}.{out_ext}"
+            targets = {a: t for a, t in targets.items() if overwrite or not t.exists()}
+            if not targets:
+                continue
+
+            feats = _dxf_features(dxf)
+            for artifact, target in targets.items():
+                order = _rank_engines(artifact, candidates[artifact], feats, timings)
+                for engine in order:
+                    target.unlink(missing_ok=True)
+                    start = time.perf_counter()
+                    if engine == "inkscape":
+                        if artifact == "pdf":
+                            ok = _pdf_inkscape_one(inkscape, dxf, target, timeout_s=timeout_s)
+                        else:
+                            ok = _png_inkscape_one(inkscape, dxf, target, dpi=dpi, timeout_s=timeout_s)
+                    else:
+                        ok, err = worker.run((artifact, engine, dxf, target, opts), timeout_s)
+                        if err:
+                            print(f"!! {engine} failed on {dxf.name}: {err}")
+                    ok = ok and target.exists()
+                    elapsed = time.perf_counter() - start
+                    # Only process start-up/IPC overhead can push a run past timeout_s
+                    slow = ok and elapsed > timeout_s
+                    if slow:
+                        print(f"[warn] {engine} took {elapsed:.0f}s on {dxf.name} (> {timeout_s}s)")
+                    _record_timing(timings, artifact, engine, feats, elapsed, ok, slow)
+                    if ok:
+                        break
+                    # Don't leave a partial file from a killed/failed engine behind
+                    target.unlink(missing_ok=True)
+                    print(f"[fallback] {artifact} for {dxf.name}: {engine} failed, trying next engine")
+                else:
+                    print(f"!! All engines failed for {artifact} on {dxf.name}")
+            _save_timings(timings_p, timings)
+
+            if test_run:
+                break
+    finally:
+        worker.close()
+
 if __name__ == "__main__":
     dxf_folder = './dwg_files/DXF_Converted'
     dxf_file = './dwg_files/DXF_Converted/civil_example-imperial.dxf'